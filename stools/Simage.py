@@ -1,7 +1,10 @@
 import json, os, cv2
+from collections import deque
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 
 # from .Sfile import get_file_list_with_str
-from PIL import Image
+from PIL import Image, GifImagePlugin
 
 
 def create_solid_color_picture(output_file, width=None, height=None, color=None):
@@ -31,24 +34,59 @@ def get_png_list(dir_path: str) -> list:
     return get_file_list_with_ext(dir_path, "png")
 
 
+def _rgba_extrema(img: Image) -> tuple:
+    """按 RGBA 四个通道返回图片的 (最小值, 最大值)，常见模式直接用 getextrema，不展开像素
+
+    无透明通道的模式视为完全不透明，其余模式先转换为 RGBA
+
+    :param PIL.Image img: 图片
+    :return tuple: 4 个 (最小值, 最大值)
+    """
+    opaque = (255, 255)
+    if img.mode == "RGBA":
+        return img.getextrema()
+    if img.mode == "RGB":
+        return img.getextrema() + (opaque,)
+    if img.mode in ("L", "1"):
+        lum = img.getextrema()
+        return (lum, lum, lum, opaque)
+    if img.mode == "LA":
+        lum, alpha = img.getextrema()
+        return (lum, lum, lum, alpha)
+    return img.convert("RGBA").getextrema()
+
+
+def is_image_solid_color(img: Image, color: tuple, tolerance: int = 0) -> bool:
+    """判断图片是否为纯色，每个通道与 color 相差不超过 tolerance
+
+    :param PIL.Image img: 图片，支持任意模式
+    :param tuple color: 颜色 (R, G, B) 或 (R, G, B, A)，三元组时不管透明度
+    :param int tolerance: 每个通道允许的偏差, defaults to 0
+    :return bool: 是否为纯色
+
+    >>> is_image_solid_color(Image.new("RGB", (4, 4), (10, 20, 30)), (12, 20, 28), 2)
+    True
+    >>> is_image_solid_color(Image.new("LA", (4, 4), (5, 0)), (5, 5, 5, 255))
+    False
+    """
+    return all(
+        c - tolerance <= lo and hi <= c + tolerance
+        for c, (lo, hi) in zip(color, _rgba_extrema(img))
+    )
+
+
 def is_image_solid_black(img: Image):
     """判断图片是否黑色且完全不透明
 
     :param PIL.Image img: 图片
     :return bool: 是否全黑
+
+    >>> is_image_solid_black(Image.new("RGBA", (4, 4), (0, 0, 0, 255)))
+    True
+    >>> is_image_solid_black(Image.new("RGBA", (4, 4), (0, 0, 0, 0)))
+    False
     """
-    # 获取图片的尺寸
-    width, height = img.size
-    # 遍历图片的每个像素
-    for x in range(width):
-        for y in range(height):
-            # 获取当前像素的RGBA值
-            r, g, b, a = img.getpixel((x, y))
-            # 如果像素不是黑色或者透明度不是完全不透明，则返回False
-            if r != 0 or g != 0 or b != 0 or a != 255:
-                return False
-    # 如果所有像素都是纯黑色且完全不透明，则返回True
-    return True
+    return is_image_solid_color(img, (0, 0, 0, 255))
 
 
 def is_image_black(img: Image):
@@ -56,55 +94,166 @@ def is_image_black(img: Image):
 
     :param PIL.Image img: 图片
     :return bool: 是否全黑
+
+    >>> is_image_black(Image.new("RGBA", (4, 4), (0, 0, 0, 0)))
+    True
+    >>> is_image_black(Image.new("L", (4, 4), 1))
+    False
     """
+    return is_image_solid_color(img, (0, 0, 0))
+
 
-    # 获取图片的尺寸
-    width, height = img.size
-    # 遍历图片的每个像素
-    for x in range(width):
-        for y in range(height):
-            # 获取当前像素的RGBA值
-            r, g, b, a = img.getpixel((x, y))
-            # 如果像素不是黑色或者透明度不是完全不透明，则返回False
-            if r != 0 or g != 0 or b != 0:
+def _is_frame_black(path: str, thumbnail: int = None, tolerance: int = 0) -> bool:
+    """打开一帧图片判断是否全黑，用完即关闭文件
+
+    给定 thumbnail 时先用缩略图快速排除非黑色帧：缩小取平均后仍超出 tolerance，
+    原图必然也超出；缩略图判为黑色时再按原图确认，不会误删有内容的帧
+
+    :param str path: 图片路径
+    :param int thumbnail: 预检缩略图的边长 (JPEG 可在解码时缩小), defaults to None
+    :param int tolerance: 每个通道允许的偏差, defaults to 0
+    :return bool: 是否全黑
+    """
+    if thumbnail:
+        with Image.open(path) as img:
+            img.thumbnail((thumbnail, thumbnail), Image.BOX)
+            if not is_image_solid_color(img, (0, 0, 0), tolerance):
                 return False
-    # 如果所有像素都是纯黑色，则返回True
-    return True
+    with Image.open(path) as img:
+        return is_image_solid_color(img, (0, 0, 0), tolerance)
 
 
-def del_end_black_frame(png_list: list):
-    """删除PNG列表末尾的黑色帧
+def del_end_black_frame(
+    png_list: list,
+    bisect: bool = False,
+    workers: int = 1,
+    thumbnail: int = None,
+    tolerance: int = 0,
+) -> list:
+    """删除PNG列表末尾的黑色帧，返回新列表，不修改输入
 
     :param list png_list: PNG 列表
+    :param bool bisect: 二分查找黑色帧的起点，只检查约 log2(n) 帧，
+        要求黑色帧在末尾连续且之前没有黑色帧, defaults to False
+    :param int workers: 从末尾逐批并行检查的线程数, defaults to 1
+    :param int thumbnail: 预检缩略图的边长，用于快速排除非黑色帧，
+        判为黑色的帧仍按原图确认, defaults to None
+    :param int tolerance: 每个通道允许的偏差, defaults to 0
+    :return list: 删除末尾黑色帧后的列表
     """
     print("Check the pure black picture at the end...")
-    while len(png_list) > 0 and is_image_black(Image.open(png_list[-1])):
-        png_list.pop()
-        print(f"Delete : {png_list[-1]}")
+
+    def is_black(path):
+        return _is_frame_black(path, thumbnail, tolerance)
+
+    end = len(png_list)
+    if bisect:
+        lo = 0
+        while lo < end:
+            mid = (lo + end) // 2
+            if is_black(png_list[mid]):
+                end = mid
+            else:
+                lo = mid + 1
+    else:
+        with ThreadPoolExecutor(max(workers, 1)) as pool:
+            while end > 0:
+                batch = png_list[max(end - max(workers, 1), 0) : end][::-1]
+                black = list(pool.map(is_black, batch))
+                n = black.index(False) if False in black else len(black)
+                end -= n
+                if n < len(black):
+                    break
+    for path in png_list[end:]:
+        print(f"Delete : {path}")
     print("Detection completed.")
+    return png_list[:end]
+
+
+def _iter_rgb_frames(png_list):
+    """逐帧打开图片并转换为 RGB，转换后立即关闭文件
+
+    :param png_list: 图片路径的可迭代对象
+    :yield PIL.Image: RGB 图片
+    """
+    for path in png_list:
+        with Image.open(path) as img:
+            yield img.convert("RGB")
 
 
-def convert_png_list_to_gif(png_list: list, output_file: str, duration=40):
+def _bounded_map(pool: ThreadPoolExecutor, fn, iterable, window: int):
+    """按顺序返回 fn 的结果，同时在途的任务不超过 window 个
+
+    :param ThreadPoolExecutor pool: 线程池
+    :param fn: 函数
+    :param iterable: 参数的可迭代对象，按需读取
+    :param int window: 最多在途的任务数
+    :yield: fn 的结果
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def convert_png_list_to_gif(
+    png_list,
+    output_file: str,
+    duration=40,
+    palette: str = "frame",
+    colors: int = 256,
+    workers: int = 1,
+):
     """将PNG队列转换为GIF (不能有透明度、否则会叠加)
 
-    :param list png_list: PNG 列表
+    逐帧读取、量化并写入文件，内存中只保留少数几帧，与帧数无关
+
+    :param png_list: PNG 列表，也可以是按需生成路径的迭代器
     :param str output_file: 输出GIF文件的路径
     :param int duration: GIF中每帧的持续时间（毫秒）, defaults to 40
+    :param str palette: "frame" 每帧单独生成调色板 (局部颜色表)，
+        "global" 用第一帧生成一次调色板供所有帧复用, defaults to "frame"
+    :param int colors: 调色板颜色数, defaults to 256
+    :param int workers: 量化的线程数, defaults to 1
+    :raises ValueError: palette 不支持或 PNG 列表为空
     """
-    images = []
-    for p in png_list:
-        img = Image.open(p)
-        images.append(img)
-
-    # 保存为GIF
-    images[0].save(
-        output_file,
-        save_all=True,
-        append_images=images[1:],
-        optimize=False,
-        duration=duration,
-        loop=0,
-    )
+    if palette not in ("frame", "global"):
+        raise ValueError(f"不支持的调色板模式: {palette}")
+    frames = _iter_rgb_frames(png_list)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("PNG 列表为空")
+    first = first.quantize(colors)
+    if palette == "global":
+
+        def quantize(img):
+            return img.quantize(palette=first)
+
+    else:
+
+        def quantize(img):
+            return img.quantize(colors)
+
+    with open(output_file, "wb") as fp, ThreadPoolExecutor(max(workers, 1)) as pool:
+        header, _ = GifImagePlugin.getheader(
+            first, info={"loop": 0, "duration": duration}
+        )
+        fp.write(b"".join(header))
+        for img in chain(
+            [first], _bounded_map(pool, quantize, frames, 2 * max(workers, 1))
+        ):
+            data = GifImagePlugin.getdata(
+                img,
+                duration=duration,
+                include_color_table=palette == "frame" and img is not first,
+            )
+            fp.writelines(data)
+            # getdata 的收集器是循环引用的局部类，清空列表以便立即释放编码数据
+            data.clear()
+        fp.write(b";")  # GIF 结束标记
 
 
 def merge_png_list(png_list: list, output_file: str):
@@ -133,7 +282,7 @@ def merge_png_list(png_list: list, output_file: str):
     )  # 输出信息文件名
     output_file = os.path.join(dir_name, file_name)  # 输出文件名
 
-    del_end_black_frame(png_list)
+    png_list = del_end_black_frame(png_list)
     num = len(png_list)
     # 使用第一张图片的高度作为新图片的高度
     first_image = Image.open(png_list[0]).convert("RGBA")
@@ -184,9 +333,29 @@ def convert_to_pixel_art(img_path: str, out_path: str, width: int, height: int):
 
 
 if __name__ == "__main__":
+    import doctest
+    from timeit import timeit
+
+    doctest.testmod()
+
+    # is_image_black 与逐像素 getpixel 循环的耗时对比
+    def is_image_black_loop(img):
+        width, height = img.size
+        for x in range(width):
+            for y in range(height):
+                r, g, b, a = img.getpixel((x, y))
+                if r != 0 or g != 0 or b != 0:
+                    return False
+        return True
+
+    img = Image.new("RGBA", (1920, 1080), (0, 0, 0, 255))
+    t_loop = timeit(lambda: is_image_black_loop(img), number=1)
+    t_fast = timeit(lambda: is_image_black(img), number=10) / 10
+    print(f"is_image_black 1920x1080: loop {t_loop:.3f} s, extrema {t_fast:.5f} s")
+
     # convert_to_pixel_art(
     #     "./assets/imgs/test.png", "./assets/imgs/test_pixel.png", 100, 100
     # )
-    convert_to_pixel_art(
-        "./assets/imgs/xx.webp", "./assets/imgs/xx_pixel.webp", 100, 100
-    )
+    # convert_to_pixel_art(
+    #     "./assets/imgs/xx.webp", "./assets/imgs/xx_pixel.webp", 100, 100
+    # )
@@ -5,49 +5,333 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import hilbert, find_peaks
-from scipy.signal import stft
-from scipy import fftpack
+from scipy.signal import get_window
+from scipy.fft import rfft, rfftfreq, next_fast_len
+from functools import lru_cache
 
+_SMOOTH_BLOCK = 1 << 13  # 分块长度，每块重新累加以限制累积和的舍入误差
+_ROC_BLOCK = 1 << 16  # abs_roc 分块长度，使中间结果留在缓存中
 
-def smooth(x: np.ndarray, M: int) -> np.ndarray:
+
+def _half_width(M: int) -> int:
+    """平滑窗半宽，M应为奇数，如果是偶数，则取大1的奇数"""
+    return round(M / 2 - 0.1)
+
+
+def _window_mean(
+    c: np.ndarray, base: int, start: int, stop: int, K: int, length: int
+) -> np.ndarray:
+    """由累积和计算 [start, stop) 上的居中滑动平均，边界处窗口收缩
+
+    :param np.ndarray c: 累积和, c[..., p - base] 为块起点到位置 p (不含) 的和
+    :param int base: c 第 0 列对应的绝对位置
+    :param int start: 输出起始位置
+    :param int stop: 输出结束位置 (不含)
+    :param int K: 窗半宽
+    :param int length: 信号总长度
+    :return np.ndarray: 滑动平均 (float64)
+    """
+    n = np.arange(start, stop)
+    lo = np.maximum(n - K, 0)
+    hi = np.minimum(n + K + 1, length)
+    return (c[..., hi - base] - c[..., lo - base]) / (hi - lo)
+
+
+def moving_average(
+    x: np.ndarray, M: int, axis: int = -1, dtype=np.float64
+) -> np.ndarray:
+    """居中滑动平均，边界处窗口收缩为实际可用的点数
+
+    按块计算累积和，复杂度 O(n)，与 M 无关
+
+    :param np.ndarray x: 需要平滑的数组，可为多维 (如 通道 × 样本)
+    :param int M: 平滑点数
+    :param int axis: 沿哪个轴平滑, defaults to -1
+    :param dtype: 输出类型 (np.float32 或 np.float64), defaults to np.float64
+    :raises ValueError: 数据长度小于平滑点数
+    :return np.ndarray: 平滑后的数组
+
+    >>> x = np.random.default_rng(0).normal(size=(2, 101))
+    >>> ref = [[np.mean(r[max(0, n - 2) : n + 3]) for n in range(101)] for r in x]
+    >>> bool(np.allclose(moving_average(x, 5), ref))
+    True
+    >>> bool(np.allclose(moving_average(x.T, 4, axis=0).T, ref))
+    True
+    >>> moving_average(x, 5, dtype=np.float32).dtype
+    dtype('float32')
+    """
+    x = np.asarray(x)
+    K = _half_width(M)
+    xm = np.moveaxis(x, axis, -1)
+    length = xm.shape[-1]
+    if length < 2 * K + 1:
+        raise ValueError("数据长度小于平滑点数")
+
+    y = np.empty(x.shape, dtype=dtype)
+    ym = np.moveaxis(y, axis, -1)
+    for start in range(0, length, _SMOOTH_BLOCK):
+        stop = min(start + _SMOOTH_BLOCK, length)
+        base = max(0, start - K)
+        seg = xm[..., base : min(stop + K, length)]
+        c = np.zeros(seg.shape[:-1] + (seg.shape[-1] + 1,))
+        np.cumsum(seg, axis=-1, dtype=np.float64, out=c[..., 1:])
+        ym[..., start:stop] = _window_mean(c, base, start, stop, K, length)
+    return y
+
+
+def smooth(x: np.ndarray, M: int, axis: int = -1, dtype=np.float64) -> np.ndarray:
     """平滑函数
 
     :param np.ndarray x: 需要平滑的数组
     :param int M: 平滑点数
+    :param int axis: 沿哪个轴平滑, defaults to -1
+    :param dtype: 输出类型 (np.float32 或 np.float64), defaults to np.float64
     :return np.ndarray: 平滑后的数组
     """
-    K = round(M / 2 - 0.1)  # M应为奇数，如果是偶数，则取大1的奇数
-    lenX = len(x)
-    if lenX < 2 * K + 1:
-        print("数据长度小于平滑点数")
-    else:
-        y = np.zeros(lenX)
-        for NN in range(0, lenX, 1):
-            startInd = max([0, NN - K])
-            endInd = min(NN + K + 1, lenX)
-            y[NN] = np.mean(x[startInd:endInd])
-    ##    y[0]=x[0]       #首部保持一致
-    ##    y[-1]=x[-1]     #尾部也保持一致
-    return y
+    return moving_average(x, M, axis=axis, dtype=dtype)
+
+
+class Smoother:
+    """流式平滑器，逐块输入信号，输出与 smooth 对整段信号的结果逐位一致
 
+    只保留约 2K 个样本的历史 (K 为窗半宽)，内存占用与信号总长度无关
 
-def abs_roc(sig: np.ndarray) -> np.ndarray:
+    :param int M: 平滑点数
+    :param int axis: 时间轴, defaults to -1
+    :param dtype: 输出类型 (np.float32 或 np.float64), defaults to np.float64
+
+    >>> x = np.random.default_rng(0).normal(size=1000)
+    >>> sm = Smoother(7)
+    >>> y = np.concatenate([sm.push(c) for c in np.array_split(x, 13)] + [sm.flush()])
+    >>> bool(np.array_equal(y, smooth(x, 7)))
+    True
+    """
+
+    def __init__(self, M: int, axis: int = -1, dtype=np.float64):
+        self.K = _half_width(M)  # 窗半宽
+        self.axis = axis  # 时间轴
+        self.dtype = dtype  # 输出类型
+        self.reset()
+
+    def reset(self):
+        """清空内部状态，开始新的信号"""
+        self._received = 0  # 已输入的样本数
+        self._next = 0  # 下一个待输出的位置
+        self._raw = None  # 原始样本，从 _raw_pos 开始，供换块时重新累加
+        self._raw_pos = 0
+        self._csum = None  # 当前块的累积和，第 0 列对应位置 _csum_pos
+        self._csum_pos = 0
+
+    def push(self, chunk: np.ndarray) -> np.ndarray:
+        """输入一块信号，返回已经可以确定的平滑结果 (可能为空)
+
+        :param np.ndarray chunk: 信号块
+        :return np.ndarray: 平滑后的数组
+        """
+        chunk = np.moveaxis(np.asarray(chunk), self.axis, -1).astype(np.float64)
+        if self._raw is None:
+            self._raw = np.zeros(chunk.shape[:-1] + (0,))
+            self._csum = np.zeros(chunk.shape[:-1] + (1,))
+        self._raw = np.concatenate([self._raw, chunk], axis=-1)
+        # 以上一个累积和为首元素继续累加，保证与一次性累加逐位一致
+        tail = np.cumsum(np.concatenate([self._csum[..., -1:], chunk], axis=-1), -1)
+        self._csum = np.concatenate([self._csum, tail[..., 1:]], axis=-1)
+        self._received += chunk.shape[-1]
+
+        if self._received < 2 * self.K + 1:
+            return self._emit(self._next, self._received)
+        return self._emit(self._received - self.K, self._received)
+
+    def flush(self) -> np.ndarray:
+        """信号结束，返回剩余的平滑结果并重置状态
+
+        :raises ValueError: 数据长度小于平滑点数
+        :return np.ndarray: 平滑后的数组
+        """
+        if self._received < 2 * self.K + 1:
+            self.reset()
+            raise ValueError("数据长度小于平滑点数")
+        y = self._emit(self._received, self._received)
+        self.reset()
+        return y
+
+    def _emit(self, limit: int, length: int) -> np.ndarray:
+        """计算 [_next, limit) 上的平滑结果"""
+        outs = [self._csum[..., :0]]
+        while self._next < limit:
+            block_end = (self._next // _SMOOTH_BLOCK + 1) * _SMOOTH_BLOCK
+            stop = min(block_end, limit)
+            outs.append(
+                _window_mean(
+                    self._csum, self._csum_pos, self._next, stop, self.K, length
+                )
+            )
+            self._next = stop
+            if stop == block_end:  # 进入下一块，从新的起点重新累加
+                base = max(0, stop - self.K)
+                self._raw = self._raw[..., base - self._raw_pos :]
+                self._raw_pos = base
+                self._csum = np.zeros(self._raw.shape[:-1] + (self._raw.shape[-1] + 1,))
+                np.cumsum(self._raw, axis=-1, out=self._csum[..., 1:])
+                self._csum_pos = base
+        self._trim()
+        y = np.concatenate(outs, axis=-1).astype(self.dtype)
+        return np.moveaxis(y, -1, self.axis)
+
+    def _trim(self):
+        """丢弃不再需要的历史"""
+        # 原始样本只在换块时使用，保留下一块的起点之后的部分
+        next_base = (self._next // _SMOOTH_BLOCK + 1) * _SMOOTH_BLOCK - self.K
+        cut = min(max(0, next_base - self._raw_pos), self._raw.shape[-1])
+        self._raw = self._raw[..., cut:]
+        self._raw_pos += cut
+        # 累积和只需覆盖后续窗口的左端
+        cut = max(0, self._next - self.K - self._csum_pos)
+        self._csum = self._csum[..., cut:]
+        self._csum_pos += cut
+
+
+def abs_roc(
+    sig: np.ndarray, axis: int = -1, out: np.ndarray = None, step: int = 1
+) -> np.ndarray:
     """
     使信号按的变化率（"rate of change"）的绝对值变\n
     对信号求 dy -> 对 dy 取绝对值 -> 累加 abs(dy)
 
-    :param np.ndarray sig: 信号序列
+    浮点输入保持原类型，其他类型按 float64 计算；分块单遍完成，不分配整段的中间数组
+
+    :param np.ndarray sig: 信号序列，可为多维 (如 通道 × 样本)
+    :param int axis: 沿哪个轴计算, defaults to -1
+    :param np.ndarray out: 输出数组，给定时直接写入并按其类型计算, defaults to None
+    :param int step: 抽取间隔，只输出第 0, step, 2*step, ... 个累加值, defaults to 1
+    :raises ValueError: out 的形状不匹配
     :return np.ndarray: 按变化率绝对值变化的信号
+
+    >>> abs_roc(np.array([1, 3, 2, 2, 5]))
+    array([0., 2., 3., 3., 6.])
+    >>> abs_roc(np.array([1, 3, 2, 2, 5]), step=2)
+    array([0., 3., 6.])
+    >>> abs_roc(np.ones((2, 3), dtype=np.float32)).dtype
+    dtype('float32')
     """
+    sig = np.asarray(sig)
+    xm = np.moveaxis(sig, axis, -1)
+    n = xm.shape[-1]
+    shape = xm.shape[:-1] + (len(range(0, n, step)),)
+    if out is None:
+        dtype = sig.dtype if np.issubdtype(sig.dtype, np.floating) else np.float64
+        out = np.moveaxis(np.empty(shape, dtype=dtype), -1, axis)
+    om = np.moveaxis(out, axis, -1)
+    if om.shape != shape:
+        raise ValueError(
+            f"out 的形状应为 {np.moveaxis(np.empty(shape), -1, axis).shape}"
+        )
+    if n == 0:
+        return out
 
-    ds = []  # 变化率序列
-    for i in range(1, len(t)):
-        ds.append((sig[i] - sig[i - 1]))
-    ds_abs = np.abs(ds)  # 变化率序列取绝对值
-    ds_E = [0]  # 变化率绝对值变化
-    for i in range(0, len(ds_abs)):
-        ds_E.append(ds_E[i] + ds_abs[i])
-    return np.array(ds_E)
+    block = max(1, _ROC_BLOCK // step) * step  # 块长为 step 的整数倍
+    buf = om if step == 1 else np.empty(shape[:-1] + (block,), dtype=out.dtype)
+    carry = 0  # 上一块末尾的累加值
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        b = om[..., start:stop] if step == 1 else buf[..., : stop - start]
+        lo = max(start, 1)
+        if start == 0:
+            b[..., 0] = 0
+        d = b[..., lo - start :]
+        np.subtract(
+            xm[..., lo:stop], xm[..., lo - 1 : stop - 1], out=d, dtype=out.dtype
+        )
+        np.abs(d, out=d)
+        if start > 0:
+            b[..., 0] += carry  # 接上一块的累加值，与整段累加逐位一致
+        np.cumsum(b, axis=-1, out=b)
+        carry = b[..., -1].copy()
+        if step > 1:
+            om[..., start // step : (stop + step - 1) // step] = b[..., ::step]
+    return out
+
+
+def _minmax_envelope(y: np.ndarray, n_bins: int) -> np.ndarray:
+    """min/max 包络抽取，将 y 分为 n_bins 组，返回每组最小值和最大值的下标 (按先后顺序)
+
+    :param np.ndarray y: 信号
+    :param int n_bins: 分组数 (一般取绘图区域的像素宽度)
+    :return np.ndarray: 需要绘制的点的下标
+    """
+    n = len(y)
+    size = -(-n // n_bins)
+    if size <= 2:
+        return np.arange(n)
+    m = n // size * size
+    groups = y[:m].reshape(-1, size)
+    base = np.arange(0, m, size)
+    i_min = base + groups.argmin(axis=1)
+    i_max = base + groups.argmax(axis=1)
+    idx = np.stack([np.minimum(i_min, i_max), np.maximum(i_min, i_max)], axis=1)
+    idx = idx.ravel()
+    if m < n:  # 不满一组的尾部
+        tail = np.sort([m + np.argmin(y[m:]), m + np.argmax(y[m:])])
+        idx = np.concatenate([idx, tail])
+    return idx
+
+
+def find_sig_peaks(
+    sig,
+    start: int = 0,
+    end: int = None,
+    prominence=None,
+    distance=None,
+    max_peaks: int = None,
+):
+    """在 sig[start:end] 中寻找峰值，返回绝对下标、峰值和突出度
+
+    在切片视图上计算，不复制信号 (scipy 要求连续的 float64，其他类型会被转换)
+
+    :param sig: 信号，二维数组 (信号数 × 样本数) 或列表表示多个信号
+    :param int start: 开始位置, defaults to 0
+    :param int end: 结束位置, defaults to None
+    :param prominence: 突出度限制 (同 scipy.signal.find_peaks), defaults to None
+    :param distance: 峰值最小间隔 (同 scipy.signal.find_peaks), defaults to None
+    :param int max_peaks: 按突出度只保留最强的若干个峰值 (0 表示不保留), defaults to None
+    :raises ValueError: max_peaks 为负数
+    :return np.ndarray: 结构化数组，字段为 index, value, prominence (按先后顺序);
+        多个信号时返回这样的数组的列表
+
+    >>> p = find_sig_peaks(np.array([0, 1, 0, 3, 0, 2, 0]), start=2)
+    >>> p["index"].tolist(), p["value"].tolist(), p["prominence"].tolist()
+    ([3, 5], [3, 2], [3.0, 2.0])
+    >>> [len(p) for p in find_sig_peaks(np.eye(2, 5))]
+    [0, 1]
+    >>> len(find_sig_peaks(np.array([0, 1, 0, 3, 0]), max_peaks=0))
+    0
+    """
+    if isinstance(sig, (list, tuple)) or np.ndim(sig) == 2:
+        return [
+            find_sig_peaks(s, start, end, prominence, distance, max_peaks) for s in sig
+        ]
+    if max_peaks is not None and max_peaks < 0:
+        raise ValueError("max_peaks 不能为负数")
+    sig = np.asarray(sig)
+    offset = range(len(sig))[start:end].start  # 切片起点的绝对位置
+    seg = sig[start:end]
+    prominence = 0 if prominence is None else prominence
+    peaks, props = find_peaks(seg, prominence=prominence, distance=distance)
+    prominences = props["prominences"]
+    if max_peaks is not None and len(peaks) > max_peaks:
+        # 从 len - max_peaks 处切片，max_peaks 为 0 时为空 ([-0:] 会取到全部)
+        n_drop = len(peaks) - max_peaks
+        keep = np.sort(np.argpartition(prominences, n_drop - 1)[n_drop:])
+        peaks, prominences = peaks[keep], prominences[keep]
+
+    result = np.empty(
+        len(peaks),
+        dtype=[("index", np.intp), ("value", seg.dtype), ("prominence", np.float64)],
+    )
+    result["index"] = peaks + offset
+    result["value"] = seg[peaks]
+    result["prominence"] = prominences
+    return result
 
 
 def compare_sig_peaks(
@@ -56,15 +340,26 @@ def compare_sig_peaks(
     x: np.ndarray = None,
     start: int = 0,
     end: int = None,
+    fast: bool = False,
+    max_peaks: int = 20,
+    prominence=None,
+    distance=None,
     **kwargs,
 ):
     """绘图对比两个信号的峰值
 
+    fast 模式用于长信号: 按画布像素宽度做 min/max 包络抽取,
+    只标记突出度最大的 max_peaks 个峰值, 并用一次 scatter 绘制峰值标记
+
     :param np.ndarray sig1: 信号1
     :param np.ndarray sig2: 信号2
     :param np.ndarray x: 共同的时间序列, defaults to None
     :param int start: 开始位置, defaults to 0
     :param int end: 结束位置, defaults to None
+    :param bool fast: 快速绘制模式, defaults to False
+    :param int max_peaks: fast 模式下每个信号最多标记的峰值个数, defaults to 20
+    :param prominence: fast 模式下峰值的突出度限制, defaults to None
+    :param distance: fast 模式下峰值的最小间隔, defaults to None
     :param int ylim: 结束位置, y轴范围 to None
     :param int xlim: 结束位置, x轴范围 to None
     """
@@ -76,9 +371,17 @@ def compare_sig_peaks(
     title = kwargs.get("title", "")
     ylim = kwargs.get("ylim", None)
     xlim = kwargs.get("xlim", None)
-    plt.figure(figsize=(10, 5))
-    plt.plot(x[start:end], sig1[start:end], color="blue", label=label1)
-    plt.plot(x[start:end], sig2[start:end], color="red", label=label2)
+    fig = plt.figure(figsize=(10, 5))
+    if fast:
+        n_bins = int(fig.get_figwidth() * fig.dpi)
+        xs = x[start:end]
+        for sig, color, label in ((sig1, "blue", label1), (sig2, "red", label2)):
+            seg = sig[start:end]
+            idx = _minmax_envelope(seg, n_bins)
+            plt.plot(xs[idx], seg[idx], color=color, label=label)
+    else:
+        plt.plot(x[start:end], sig1[start:end], color="blue", label=label1)
+        plt.plot(x[start:end], sig2[start:end], color="red", label=label2)
     # plt.grid()
     if ylim is not None:
         plt.ylim(ylim[0], ylim[1])
@@ -88,59 +391,271 @@ def compare_sig_peaks(
     plt.xlabel(xlabel, fontsize=16)
     plt.legend(fontsize=16)
 
-    # 寻找峰值
-    peaks, _ = find_peaks(sig1[start:end])
-    for i in peaks:
-        plt.annotate(
-            str(x[i]),  # 注释文本
-            (x[i], sig1[i]),  # 被标记的点的坐标
-            textcoords="offset points",  # 文本偏移量
-            xytext=(0, 10),  # 文本偏移的方向和距离
-            arrowprops=dict(arrowstyle="->"),
-            color="blue",
-            fontsize=16,
-        )  # 箭头的样式
-
-    # 寻找峰值
-    peaks, _ = find_peaks(sig2[start:end])
-    for i in peaks:
-        plt.annotate(
-            str(x[i]),  # 注释文本
-            (x[i], sig2[i]),  # 被标记的点的坐标
-            textcoords="offset points",  # 文本偏移量
-            xytext=(0, 10),  # 文本偏移的方向和距离
-            arrowprops=dict(arrowstyle="->"),
-            color="red",
-            fontsize=16,
-        )  # 箭头的样式
+    for sig, color in ((sig1, "blue"), (sig2, "red")):
+        if fast:
+            peaks = find_sig_peaks(sig, start, end, prominence, distance, max_peaks)
+            plt.scatter(
+                x[peaks["index"]], peaks["value"], color=color, marker="v", zorder=3
+            )
+            continue
+        # 寻找峰值
+        for i in find_sig_peaks(sig, start, end)["index"]:
+            plt.annotate(
+                str(x[i]),  # 注释文本
+                (x[i], sig[i]),  # 被标记的点的坐标
+                textcoords="offset points",  # 文本偏移量
+                xytext=(0, 10),  # 文本偏移的方向和距离
+                arrowprops=dict(arrowstyle="->"),
+                color=color,
+                fontsize=16,
+            )  # 箭头的样式
     plt.show()
 
 
-def spectrum(signal: np.ndarray, sample_interval: int, isdB: bool = False):
+@lru_cache(maxsize=32)
+def _rfft_freq(nfft: int, sample_interval: float) -> np.ndarray:
+    """实数 FFT 的频率轴，按 (nfft, 采样间隔) 缓存，返回只读数组"""
+    f = rfftfreq(nfft, sample_interval)
+    f.flags.writeable = False
+    return f
+
+
+def compute_spectrum(
+    signal: np.ndarray,
+    sample_interval: float,
+    isdB: bool = False,
+    fast_len: bool = True,
+    axis: int = -1,
+) -> tuple:
+    """计算 signal 的傅里叶变换频谱 (不绘图)
+
+    使用实数 FFT，只计算非负频率部分
+
+    :param np.ndarray signal: 信号序列
+    :param float sample_interval: 采样间隔 ( 1/fs)
+    :param bool isdB: 返回 dB (20*log10 幅值), defaults to False
+    :param bool fast_len: 补零到 FFT 的快速长度, defaults to True
+    :param int axis: 沿哪个轴计算, defaults to -1
+    :return tuple: (频率 (只读), 幅值或 dB)
+
+    >>> t = np.arange(1000) / 1000
+    >>> f, a = compute_spectrum(np.sin(2 * np.pi * 50 * t), 1 / 1000)
+    >>> float(f[np.argmax(a)])
+    50.0
+    """
+    signal = np.asarray(signal)
+    length = signal.shape[axis]
+    nfft = next_fast_len(length, real=True) if fast_len else length
+    s_fft = np.abs(rfft(signal, n=nfft, axis=axis))
+    if isdB:
+        _amp_to_dB(s_fft)
+    return _rfft_freq(nfft, float(sample_interval)), s_fft
+
+
+def compute_spectrum_batch(
+    segments: np.ndarray,
+    sample_interval: float,
+    window=None,
+    average: bool = False,
+    isdB: bool = False,
+    fast_len: bool = True,
+    chunk_size: int = None,
+    out: np.ndarray = None,
+) -> tuple:
+    """批量计算等长信号段的频谱 (不绘图)
+
+    每次对 chunk_size 个信号段做一次向量化的实数 FFT，峰值内存由 chunk_size 决定
+
+    :param np.ndarray segments: 信号段 (段数 × 段长)，可为 np.memmap
+    :param float sample_interval: 采样间隔 ( 1/fs)
+    :param window: 窗型 (scipy.signal.get_window 的参数) 或窗数组, defaults to None
+    :param bool average: 按功率平均所有段 (Welch 方式)，返回均方根幅值, defaults to False
+    :param bool isdB: 返回 dB (20*log10 幅值), defaults to False
+    :param bool fast_len: 补零到 FFT 的快速长度, defaults to True
+    :param int chunk_size: 每次计算的段数, defaults to None (全部)
+    :param np.ndarray out: 输出数组 (段数 × 频点数)，可为 np.memmap, defaults to None
+    :raises ValueError: segments 不是二维数组
+    :return tuple: (频率 (只读), 幅值或 dB)
+
+    >>> segs = np.random.default_rng(0).normal(size=(10, 256))
+    >>> f, a = compute_spectrum_batch(segs, 1e-3, chunk_size=3)
+    >>> bool(np.allclose(a, compute_spectrum(segs, 1e-3)[1]))
+    True
+    >>> compute_spectrum_batch(segs, 1e-3, window="hann", average=True)[1].shape
+    (129,)
+    """
+    segments = np.asarray(segments)
+    if segments.ndim != 2:
+        raise ValueError("segments 应为二维数组 (段数 × 段长)")
+    n_seg, length = segments.shape
+    nfft = next_fast_len(length, real=True) if fast_len else length
+    f = _rfft_freq(nfft, float(sample_interval))
+    if window is not None and not isinstance(window, np.ndarray):
+        window = get_window(window, length)
+    chunk_size = n_seg if chunk_size is None else chunk_size
+
+    if average:
+        power = np.zeros(len(f))
+    elif out is None:
+        out = np.empty((n_seg, len(f)))
+    for start in range(0, n_seg, chunk_size):
+        seg = segments[start : start + chunk_size]
+        if window is not None:
+            seg = seg * window
+        s_fft = rfft(seg, n=nfft, axis=-1)
+        if average:
+            power += (s_fft.real**2 + s_fft.imag**2).sum(axis=0)
+        else:
+            a = out[start : start + len(seg)]
+            np.abs(s_fft, out=a)
+            if isdB:
+                _amp_to_dB(a)
+    if average:
+        out = np.sqrt(power / n_seg)
+        if isdB:
+            _amp_to_dB(out)
+    return f, out
+
+
+def _amp_to_dB(a: np.ndarray):
+    """幅值原地转换为 dB"""
+    np.maximum(a, np.finfo(a.dtype).tiny, out=a)  # 避免 log(0)
+    np.log10(a, out=a)
+    a *= 20
+
+
+def spectrum(
+    signal: np.ndarray,
+    sample_interval: float,
+    isdB: bool = False,
+    figsize=(10, 6),
+):
     """绘制 signal 的傅里叶变换频谱图
 
     :param np.ndarray signal: 信号序列
-    :param int sample_interval: 采样间隔 ( 1/fs)
+    :param float sample_interval: 采样间隔 ( 1/fs)
     :param bool isdB: dB 显示, defaults to False
+    :param tuple figsize: 画布尺寸, defaults to (10, 6)
     """
-    length = len(signal)
-    if isdB:
-        s_fft = 10 * np.log10(fftpack.fft(signal))
-        f = fftpack.fftfreq(length, sample_interval)
-    else:
-        # 频域
-        s_fft = fftpack.fft(signal)
-        f = fftpack.fftfreq(length, sample_interval)
+    f, s_fft = compute_spectrum(signal, sample_interval, isdB=isdB)
     mask = f > 0
     plt.figure(figsize=figsize)
-    plt.plot(f[mask], abs(s_fft[mask]))
+    plt.plot(f[mask], s_fft[mask])
     plt.title("Frequency Spectrum")
     plt.xlabel("Frequency (Hz)")
-    plt.ylabel("Amplitude")
+    plt.ylabel("Amplitude (dB)" if isdB else "Amplitude")
     plt.grid()
     plt.show()
 
 
+def _stft_n_frames(length: int, nperseg: int, noverlap: int) -> int:
+    """与 scipy.signal.stft (boundary="zeros", padded=True) 一致的帧数"""
+    step = nperseg - noverlap
+    n = length + 2 * (nperseg // 2)
+    n += (-(n - nperseg) % step) % nperseg
+    return (n - nperseg) // step + 1
+
+
+def iter_stft(
+    source,
+    window="hamming",
+    nperseg: int = 256,
+    noverlap: int = 128,
+    isdB: bool = False,
+    dtype=np.float32,
+    block_frames: int = 1024,
+):
+    """流式短时傅里叶变换，逐块产生幅值帧
+
+    帧的划分、补零和缩放与 scipy.signal.stft 的默认设置一致，
+    块与块之间保留重叠部分，内存只与 block_frames 有关
+
+    :param source: 一维信号 (可为 np.memmap 或列表) 或产生一维信号块的迭代器
+    :param window: 窗型 (scipy.signal.get_window 的参数) 或窗数组, defaults to "hamming"
+    :param int nperseg: 窗长, defaults to 256
+    :param int noverlap: 重叠样本数, defaults to 128
+    :param bool isdB: 输出 dB (20*log10 幅值), defaults to False
+    :param dtype: 输出类型, defaults to np.float32
+    :param int block_frames: 每块帧数，除最后一块外都等于该值, defaults to 1024
+    :yield np.ndarray: 幅值帧 (帧数 × 频点数)
+    """
+    step = nperseg - noverlap
+    if not isinstance(window, np.ndarray):
+        window = get_window(window, nperseg)
+    window = window / window.sum()  # 与 scipy.signal.stft 的缩放一致
+    if isinstance(source, np.ndarray) or iter(source) is not source:
+        x, size = np.asarray(source), block_frames * step  # 列表等序列视为整段信号
+        source = (x[i : i + size] for i in range(0, len(x), size))
+
+    def frames(buf, n):
+        fr = np.lib.stride_tricks.sliding_window_view(buf, nperseg)[: n * step : step]
+        mag = np.abs(rfft(fr * window, axis=-1)).astype(dtype, copy=False)
+        if isdB:
+            _amp_to_dB(mag)
+        return mag
+
+    buf = np.zeros(nperseg // 2)  # 起始边界补零
+    for chunk in source:
+        buf = np.concatenate([buf, chunk])
+        n = (len(buf) - nperseg) // step + 1 if len(buf) >= nperseg else 0
+        while n >= block_frames:
+            yield frames(buf, block_frames)
+            buf = buf[block_frames * step :]
+            n -= block_frames
+
+    # 结束边界补零，并补齐最后一帧
+    buf = np.concatenate([buf, np.zeros(nperseg // 2)])
+    buf = np.concatenate([buf, np.zeros((-(len(buf) - nperseg) % step) % nperseg)])
+    n = (len(buf) - nperseg) // step + 1
+    for start in range(0, n, block_frames):
+        yield frames(buf[start * step :], min(block_frames, n - start))
+
+
+def compute_stft(
+    source,
+    fs: float,
+    window="hamming",
+    nperseg: int = 256,
+    noverlap: int = 128,
+    isdB: bool = False,
+    dtype=np.float32,
+    out: np.ndarray = None,
+) -> tuple:
+    """计算短时傅里叶变换的幅值 (不绘图)
+
+    :param source: 一维信号 (可为 np.memmap 或列表) 或产生一维信号块的迭代器
+    :param float fs: 采样率
+    :param window: 窗型, defaults to "hamming"
+    :param int nperseg: 窗长, defaults to 256
+    :param int noverlap: 重叠样本数, defaults to 128
+    :param bool isdB: 输出 dB (20*log10 幅值), defaults to False
+    :param dtype: 输出类型, defaults to np.float32
+    :param np.ndarray out: 输出数组 (帧数 × 频点数)，可为 np.memmap, defaults to None
+    :raises ValueError: out 的帧数与信号不符
+    :return tuple: (频率, 时间, 幅值 (帧数 × 频点数，即 scipy.signal.stft 结果的转置))
+
+    >>> from scipy.signal import stft
+    >>> x = np.random.default_rng(0).normal(size=5000)
+    >>> f, t, Sxx = compute_stft(iter(np.array_split(x, 7)), 1000, dtype=np.float64)
+    >>> bool(np.allclose(Sxx.T, np.abs(stft(x, 1000, window="hamming")[2])))
+    True
+    """
+    if out is None:
+        blocks = list(iter_stft(source, window, nperseg, noverlap, isdB, dtype))
+        out = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+    else:
+        n = 0
+        for block in iter_stft(source, window, nperseg, noverlap, isdB, out.dtype):
+            if n + len(block) > len(out):
+                raise ValueError("out 的帧数小于信号的帧数")
+            out[n : n + len(block)] = block
+            n += len(block)
+        if n != len(out):
+            raise ValueError(f"out 的帧数应为 {n}")
+    t = np.arange(len(out)) * ((nperseg - noverlap) / fs)
+    return _rfft_freq(nperseg, 1 / fs), t, out
+
+
 def pspectrum(
     x: np.ndarray,
     fs: float,
@@ -153,7 +668,7 @@ def pspectrum(
     *args,
     **kwargs,
 ):
-    """绘制短时傅里叶变换图
+    """绘制短时傅里叶变换图，时间轴按画布宽度抽取 (每组帧取最大值)
 
     :param np.ndarray x: 信号
     :param float fs: 采样率
@@ -173,10 +688,17 @@ def pspectrum(
     label_fontsize = kwargs.get("label_fontsize", 17)
     tick_fontsize = kwargs.get("tick_fontsize", 16)
 
-    plt.figure(figsize=figsize)
-    freq_stft, t, Zxx = stft(x, fs, window=window, nperseg=nperseg, noverlap=noverlap)
-    freq_stft = np.abs(freq_stft)
-    plt.pcolormesh(t, freq_stft, np.abs(Zxx), shading=shading)
+    # 按画布宽度的像素数抽取时间轴，每组帧取最大值
+    fig = plt.figure(figsize=figsize)
+    n_frames = _stft_n_frames(len(x), nperseg, noverlap)
+    decim = max(1, -(-n_frames // int(fig.get_figwidth() * fig.dpi)))
+    block_frames = decim * max(1, 1024 // decim)
+    cols = []
+    for block in iter_stft(x, window, nperseg, noverlap, block_frames=block_frames):
+        cols.append(np.maximum.reduceat(block, np.arange(0, len(block), decim)))
+    Sxx = np.concatenate(cols)
+    t = np.arange(0, n_frames, decim) * ((nperseg - noverlap) / fs)
+    plt.pcolormesh(t, _rfft_freq(nperseg, 1 / fs), Sxx.T, shading=shading)
     plt.ylabel(ylabel, fontsize=label_fontsize)
     plt.xlabel(xlabel, fontsize=label_fontsize)
     plt.title(title)
@@ -221,7 +743,23 @@ def acquire_len(time: float, fs: float) -> int:
 
 
 if __name__ == "__main__":
-    pass
-    a = np.array([1, 2, 3, 4, 5, 3, 2, 1, 2, 3])
-    b = np.array([1, 2, 3, 4, 1, 2, 1, 1, 1, 1])
-    compare_sig_peaks(a, b, ylim=(-1, 6))
+    import doctest
+    from timeit import timeit
+
+    doctest.testmod()
+
+    # abs_roc 与逐点循环的耗时对比
+    def abs_roc_loop(sig):
+        ds_E = [0]
+        for i in range(1, len(sig)):
+            ds_E.append(ds_E[-1] + abs(sig[i] - sig[i - 1]))
+        return np.array(ds_E)
+
+    sig = np.random.default_rng(0).normal(size=1_000_000)
+    t_loop = timeit(lambda: abs_roc_loop(sig), number=1)
+    t_vec = timeit(lambda: abs_roc(sig), number=10) / 10
+    print(f"abs_roc: loop {t_loop:.3f} s, vectorized {t_vec:.4f} s")
+
+    # a = np.array([1, 2, 3, 4, 5, 3, 2, 1, 2, 3])
+    # b = np.array([1, 2, 3, 4, 1, 2, 1, 1, 1, 1])
+    # compare_sig_peaks(a, b, ylim=(-1, 6))
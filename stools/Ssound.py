@@ -1,8 +1,715 @@
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import wave
-import pyaudio
+import struct
+import threading
+import queue
+import weakref
 import numpy as np
+from collections import namedtuple
+
+# PortAudio 样本格式，与 pyaudio.paFloat32 等取值相同，使用时无需导入 pyaudio
+paFloat32 = 0x00000001
+paInt32 = 0x00000002
+paInt24 = 0x00000004
+paInt16 = 0x00000008
+paInt8 = 0x00000010
+paUInt8 = 0x00000020
+
+# PortAudio 回调返回值
+_PA_CONTINUE = 0
+_PA_COMPLETE = 1
+_PA_ABORT = 2
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_UNKNOWN_SIZE = 0xFFFFFFFF  # 流式写入时 RIFF/data 块大小的占位值，表示到文件末尾
+_LEVEL_BLOCK = 1 << 16  # 归一化时每块处理的帧数
+_INT16_MIN, _INT16_MAX = -(1 << 15), (1 << 15) - 1
+
+# RIFF/WAVE 头信息: 格式标签、通道数、采样率、位深、每帧字节数、data 块偏移、帧数
+_WavInfo = namedtuple(
+    "_WavInfo", "format_tag channels rate bits block_align offset n_frames"
+)
+
+
+def _read_wav_header(f) -> _WavInfo:
+    """解析 RIFF/WAVE 文件头，定位 data 块，返回时文件位置在 data 块起点
+
+    :param f: 以二进制方式打开的文件
+    :raises ValueError: 不是 RIFF/WAVE 文件或缺少 fmt/data 块
+    :return _WavInfo: 头信息
+    """
+    riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave_id != b"WAVE":
+        raise ValueError("不是 RIFF/WAVE 文件")
+    fmt = None
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            raise ValueError("缺少 data 块")
+        chunk_id, size = struct.unpack("<4sI", head)
+        if chunk_id == b"data":
+            if fmt is None or fmt[4] == 0:
+                raise ValueError("缺少或无效的 fmt 块")
+            offset = f.tell()
+            # 流式写入未完成的文件 data 大小可能为占位值 (0 或 0xFFFFFFFF) 或不正确，
+            # 以文件实际长度为准
+            remaining = f.seek(0, 2) - offset
+            size = remaining if size in (0, _UNKNOWN_SIZE) else min(size, remaining)
+            f.seek(offset)
+            format_tag, channels, rate, _, block_align, bits = fmt
+            return _WavInfo(
+                format_tag,
+                channels,
+                rate,
+                bits,
+                block_align,
+                offset,
+                size // block_align,
+            )
+        if chunk_id == b"fmt ":
+            fmt = list(struct.unpack("<HHIIHH", f.read(16)))
+            size -= 16
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 24:
+                # cbSize, 有效位数, 声道掩码, SubFormat GUID (前 2 字节为实际格式)
+                fmt[0] = struct.unpack("<HHIH14x", f.read(24))[3]
+                size -= 24
+        f.seek(size + size % 2, 1)  # 块按偶数字节对齐
+
+
+def _wav_dtype(info: _WavInfo) -> str:
+    """data 块中样本的 numpy 类型，24 位 PCM 没有对应类型，返回 None
+
+    :raises ValueError: 不支持的格式或位深
+    """
+    if info.format_tag == _WAVE_FORMAT_PCM:
+        dtype = {8: "u1", 16: "<i2", 24: None, 32: "<i4"}
+    elif info.format_tag == _WAVE_FORMAT_IEEE_FLOAT:
+        dtype = {32: "<f4", 64: "<f8"}
+    else:
+        raise ValueError(f"Unsupported format: {info.format_tag:#06x}")
+    if info.bits not in dtype:
+        raise ValueError("Unsupported sample width")
+    return dtype[info.bits]
+
+
+def _decode_frames(
+    buf: np.ndarray, frames: int, info: _WavInfo, normalize: bool = False
+) -> np.ndarray:
+    """将 data 块的原始字节解码为 (帧数 × 通道数) 数组，除 24 位 PCM 和归一化外不复制
+
+    :param np.ndarray buf: 原始字节 (uint8)，24 位 PCM 时末尾需多留 1 个字节
+    :param int frames: 帧数
+    :param _WavInfo info: 头信息
+    :param bool normalize: 归一化为 [-1, 1) 的 float32, defaults to False
+    :return np.ndarray: 音频数据
+    """
+    dtype = _wav_dtype(info)
+    if dtype is None:
+        # 每隔 3 字节读一个 int32 (多读入下一样本的 1 字节)，再左移、算术右移做符号扩展
+        data = np.ndarray(
+            (frames, info.channels),
+            dtype="<i4",
+            buffer=buf,
+            strides=(info.block_align, 3),
+        )
+        data = data << 8
+        data >>= 8
+    else:
+        data = buf[: frames * info.block_align].view(dtype)
+        data = data.reshape(frames, info.channels)
+    if normalize:
+        if info.format_tag == _WAVE_FORMAT_IEEE_FLOAT:
+            return data.astype(np.float32)
+        data = data.astype(np.float32)
+        if info.bits == 8:  # 8 位 PCM 为无符号数
+            data -= 128
+        data *= 1 / (1 << (info.bits - 1))
+    return data
+
+
+# WavWriter 支持的样本格式: (格式标签, 位深, 满量程)
+_SAMPLE_FORMATS = {
+    "int16": (_WAVE_FORMAT_PCM, 16, 1 << 15),
+    "int24": (_WAVE_FORMAT_PCM, 24, 1 << 23),
+    "int32": (_WAVE_FORMAT_PCM, 32, 1 << 31),
+    "float32": (_WAVE_FORMAT_IEEE_FLOAT, 32, 1),
+}
+
+# PyAudio 格式到 WavWriter 样本格式的对应
+_PA_SAMPLE_FORMATS = {
+    paInt16: "int16",
+    paInt24: "int24",
+    paInt32: "int32",
+    paFloat32: "float32",
+}
+
+# 进程内共享的 PyAudio 实例及其引用计数
+_pa_lock = threading.Lock()
+_pa_instance = None
+_pa_refs = 0
+
+
+def _acquire_pyaudio():
+    """获取共享的 PyAudio 实例，首次使用时才导入 pyaudio 并初始化 PortAudio
+
+    :return pyaudio.PyAudio: 共享实例
+    """
+    global _pa_instance, _pa_refs
+    with _pa_lock:
+        if _pa_instance is None:
+            import pyaudio
+
+            _pa_instance = pyaudio.PyAudio()
+        _pa_refs += 1
+        return _pa_instance
+
+
+def _release_pyaudio():
+    """释放一次引用，引用计数归零时终止 PortAudio"""
+    global _pa_instance, _pa_refs
+    with _pa_lock:
+        _pa_refs -= 1
+        if _pa_refs == 0 and _pa_instance is not None:
+            _pa_instance.terminate()
+            _pa_instance = None
+
+
+class WavWriter:
+    """流式写入 wav 文件，逐块追加数据，关闭时回填 RIFF 头中的大小
+
+    浮点数据按满量程 [-1, 1] 解释，整数数据按其类型的满量程解释，超出范围的值被截断
+
+    :param str filename: 文件名
+    :param int rate: 采样率, defaults to 44100
+    :param int channels: 通道数, defaults to 1
+    :param str sample_format: 样本格式 ("int16", "int24", "int32", "float32"),
+        defaults to "int16"
+
+    >>> import os, tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), "a.wav")
+    >>> with WavWriter(filename, rate=8000, sample_format="int24") as wf:
+    ...     wf.write(np.array([0.5, -1.5]))
+    ...     wf.write(np.array([1000, 1 << 30], dtype=np.int32))
+    >>> Sound.load_wav(filename)
+    (array([ 4194304, -8388608,        3,  4194304], dtype=int32), 8000)
+
+    未关闭的文件也能读出已写入的数据
+
+    >>> wf = WavWriter(filename)
+    >>> wf.write(np.array([1, 2, 3], dtype=np.int16))
+    >>> wf._file.flush()
+    >>> Sound.load_wav(filename)[0]
+    array([1, 2, 3], dtype=int16)
+    >>> wf.close()
+
+    (通道数 × 帧数) 的信号转置后直接写入
+
+    >>> sig = np.array([[0.5, 0.25], [-0.5, -0.25]])
+    >>> with WavWriter(filename, channels=2) as wf:
+    ...     wf.write(sig.T)
+    >>> Sound.load_wav(filename)[0]
+    array([[ 16384, -16384],
+           [  8192,  -8192]], dtype=int16)
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        rate: int = 44100,
+        channels: int = 1,
+        sample_format: str = "int16",
+    ):
+        if sample_format not in _SAMPLE_FORMATS:
+            raise ValueError(f"不支持的样本格式: {sample_format}")
+        self.rate = rate  # 采样率
+        self.channels = channels  # 通道数
+        self.sample_format = sample_format  # 样本格式
+        self.n_frames = 0  # 已写入的帧数
+        format_tag, bits, _ = _SAMPLE_FORMATS[sample_format]
+        self._block_align = channels * bits // 8
+
+        self._file = open(filename, "wb")
+        fmt = struct.pack(
+            "<HHIIHH",
+            format_tag,
+            channels,
+            rate,
+            rate * self._block_align,
+            self._block_align,
+            bits,
+        )
+        header = b"WAVE"
+        if format_tag == _WAVE_FORMAT_IEEE_FLOAT:  # 非 PCM 格式带 cbSize 和 fact 块
+            header += b"fmt " + struct.pack("<I", 18) + fmt + b"\0\0"
+            header += b"fact" + struct.pack("<II", 4, 0)
+        else:
+            header += b"fmt " + struct.pack("<I", 16) + fmt
+        # 大小在 close 时回填，未关闭 (如录音中断) 的文件按占位值读到文件末尾
+        self._file.write(b"RIFF" + struct.pack("<I", _UNKNOWN_SIZE) + header)
+        self._file.write(b"data" + struct.pack("<I", _UNKNOWN_SIZE))
+        self._data_offset = self._file.tell()
+
+    def write(self, block: np.ndarray):
+        """追加一块数据
+
+        :param np.ndarray block: 音频块 (帧数,) 或 (帧数 × 通道数)
+        """
+        block = np.asarray(block)
+        # astype 和 ufunc 会保留 F 序等内存布局，写入前统一为按帧交错的 C 序
+        self._file.write(np.ascontiguousarray(self._encode(block)).data)
+        self.n_frames += block.size // self.channels
+
+    def write_frames(self, data: bytes):
+        """追加已是目标样本格式的原始帧字节，不做转换
+
+        :param bytes data: 原始帧字节 (如 PyAudio 输入流读到的数据)
+        """
+        self._file.write(data)
+        self.n_frames += len(data) // self._block_align
+
+    def _encode(self, block: np.ndarray) -> np.ndarray:
+        """将一块数据转换为目标样本格式的连续数组"""
+        _, bits, full_scale = _SAMPLE_FORMATS[self.sample_format]
+        if self.sample_format == "float32":
+            if np.issubdtype(block.dtype, np.floating):
+                x = block.astype(np.float32)
+            else:
+                x = _to_full_scale(block).astype(np.float32)
+            return np.clip(x, -1, 1, out=x)
+        target = np.dtype("<i2" if bits == 16 else "<i4")
+        if block.dtype == target and bits != 24:  # 类型与满量程都相同，直接写入
+            x = np.ascontiguousarray(block)
+        elif block.dtype == np.int32 and bits == 24:  # 去掉 int32 的低 8 位
+            x = block >> 8
+        else:
+            if np.issubdtype(block.dtype, np.floating):
+                x = block * full_scale
+            else:
+                x = _to_full_scale(block) * full_scale
+            np.clip(x, -full_scale, full_scale - 1, out=x)
+            x = x.astype(target)
+        if bits == 24:  # 取每个 int32 的低 3 个字节
+            x = np.ascontiguousarray(x.reshape(-1, 1).view(np.uint8)[:, :3])
+        return x
+
+    def close(self):
+        """回填 RIFF 头中的大小并关闭文件"""
+        if self._file.closed:
+            return
+        data_size = self.n_frames * self._block_align
+        if data_size % 2:  # 块按偶数字节对齐
+            self._file.write(b"\0")
+        riff_size = self._file.tell() - 8
+        self._file.seek(4)
+        self._file.write(struct.pack("<I", riff_size))
+        self._file.seek(self._data_offset - 4)
+        self._file.write(struct.pack("<I", data_size))
+        if self.sample_format == "float32":
+            self._file.seek(self._data_offset - 12)  # fact 块的样本帧数
+            self._file.write(struct.pack("<I", self.n_frames))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _to_full_scale(block: np.ndarray) -> np.ndarray:
+    """整数样本按其类型的满量程转换为 [-1, 1) 的 float64"""
+    info = np.iinfo(block.dtype)
+    if info.min == 0:  # 无符号数 (如 8 位 PCM) 以中点为零
+        return (block - (info.max + 1) / 2) / ((info.max + 1) / 2)
+    return block / -float(info.min)
+
+
+def _iter_blocks(source, block_frames: int = _LEVEL_BLOCK):
+    """将数组 (含 memmap) 和样本列表按帧切块，其余可迭代对象原样逐块返回"""
+    if callable(source):
+        source = source()
+    if isinstance(source, (list, tuple)) and (not source or np.ndim(source[0]) == 0):
+        source = np.asarray(source)  # 元素为标量的列表是一段信号，而不是块的列表
+    if isinstance(source, np.ndarray):
+        for i in range(0, max(len(source), 1), block_frames):
+            yield source[i : i + block_frames]
+    else:
+        yield from source
+
+
+def measure_level(source, mode: str = "peak", block_frames: int = _LEVEL_BLOCK):
+    """逐块计算音频的绝对峰值或均方根，内存占用只与块大小有关
+
+    :param source: np.ndarray (可为 memmap)、音频块的可迭代对象，或返回迭代器的无参函数
+    :param str mode: "peak" 绝对峰值，"rms" 均方根, defaults to "peak"
+    :param int block_frames: 数组按此帧数分块, defaults to 65536
+    :raises ValueError: mode 不支持
+    :return float: 电平
+
+    >>> measure_level(np.array([1, -3, 2], dtype=np.int16))
+    3.0
+    >>> measure_level([np.array([3.0]), np.array([-3.0, 3.0])], mode="rms")
+    3.0
+    >>> measure_level([0.1, -0.5, 0.3])
+    0.5
+    """
+    if mode not in ("peak", "rms"):
+        raise ValueError(f"不支持的模式: {mode}")
+    level, n = 0.0, 0
+    for block in _iter_blocks(source, block_frames):
+        block = np.asarray(block)
+        if block.size == 0:
+            continue
+        if mode == "peak":  # 用 max/min 代替 abs，避免整数最小值溢出和临时数组
+            level = max(level, float(block.max()), -float(block.min()))
+        else:
+            b = block.astype(np.float64).ravel()
+            level += float(b @ b)
+            n += b.size
+    if mode == "rms":
+        level = (level / n) ** 0.5 if n else 0.0
+    return level
+
+
+def normalize_gain(
+    source,
+    target: float = 1.0,
+    mode: str = "peak",
+    block_frames: int = _LEVEL_BLOCK,
+) -> float:
+    """计算使音频电平达到 target 的增益 (第一遍)
+
+    :param source: 同 measure_level；mode 为 "gain" 时不读取
+    :param float target: 目标电平 ("gain" 模式下即增益), defaults to 1.0
+    :param str mode: "peak"、"rms" 或固定增益 "gain", defaults to "peak"
+    :param int block_frames: 数组按此帧数分块, defaults to 65536
+    :return float: 增益，静音时为 1.0
+
+    >>> normalize_gain(np.array([0.5, -2.0]), target=1000)
+    500.0
+    """
+    if mode == "gain":
+        return float(target)
+    level = measure_level(source, mode, block_frames)
+    return target / level if level > 0 else 1.0
+
+
+def apply_gain(block: np.ndarray, gain: float, out: np.ndarray = None) -> np.ndarray:
+    """按增益缩放一块数据，并饱和截断到 int16 范围
+
+    :param np.ndarray block: 音频块
+    :param float gain: 增益
+    :param np.ndarray out: int16 输出数组，为 None 时新建, defaults to None
+    :return np.ndarray: int16 数组
+
+    >>> apply_gain(np.array([0.5, -2.0, 40.0]), 1000)
+    array([  500, -2000, 32767], dtype=int16)
+    """
+    block = np.asarray(block)
+    ftype = np.float32 if block.dtype == np.float32 else np.float64
+    x = np.multiply(block, gain, dtype=ftype)  # 唯一的临时数组，其余原地完成
+    np.clip(x, _INT16_MIN, _INT16_MAX, out=x)
+    if out is None:
+        return x.astype(np.int16)
+    np.copyto(out, x, casting="unsafe")
+    return out
+
+
+def _check_two_pass(source, mode: str):
+    """两遍归一化要求 source 可重复读取，单遍迭代器只能用 "gain" 模式
+
+    :raises ValueError: 单遍迭代器需要两遍归一化
+    """
+    if (
+        mode != "gain"
+        and not isinstance(source, np.ndarray)
+        and not callable(source)
+        and iter(source) is source
+    ):
+        raise ValueError(
+            '迭代器只能读取一遍，需使用 mode="gain" 或传入返回迭代器的函数'
+        )
+
+
+def iter_normalized(
+    source,
+    target: float = 1.0,
+    mode: str = "peak",
+    block_frames: int = _LEVEL_BLOCK,
+):
+    """两遍归一化：调用时即完成第一遍计算电平，返回逐块缩放为 int16 的迭代器
+
+    source 需可重复读取 (数组、列表或返回新迭代器的无参函数)；"gain" 模式只读一遍
+
+    :param source: 同 measure_level
+    :param float target: 目标电平 (int16 单位) 或固定增益, defaults to 1.0
+    :param str mode: "peak"、"rms" 或 "gain", defaults to "peak"
+    :param int block_frames: 数组按此帧数分块, defaults to 65536
+    :raises ValueError: 单遍迭代器需要两遍归一化
+    :return: int16 音频块的迭代器
+
+    >>> x = np.array([1.0, -4.0, 2.0])
+    >>> np.concatenate(list(iter_normalized(x, 2000, block_frames=2)))
+    array([  500, -2000,  1000], dtype=int16)
+    >>> iter_normalized(iter([x]), 2000)
+    Traceback (most recent call last):
+    ...
+    ValueError: 迭代器只能读取一遍，需使用 mode="gain" 或传入返回迭代器的函数
+    """
+    _check_two_pass(source, mode)
+    gain = normalize_gain(source, target, mode, block_frames)
+    return (apply_gain(block, gain) for block in _iter_blocks(source, block_frames))
+
+
+def _level_target(level: float, mode: str) -> tuple:
+    """将声音等级换算为 (目标电平, 模式)，等级 0 表示不做变化"""
+    assert level >= 0 and level <= 30, "声音等级必须在 0-30 之间"
+    if level == 0:
+        return 1.0, "gain"
+    return level * 1e3, mode
+
+
+class Playback:
+    """非阻塞播放的控制句柄，由 Sound.play 创建
+
+    回调在 PyAudio 的音频线程中按需取数，每次凑满 frame_count 帧的 int16 数据
+
+    :param blocks: int16 音频块的迭代器 (帧数,) 或 (帧数 × 通道数)
+    :param int channels: 通道数, defaults to 1
+    """
+
+    def __init__(self, blocks, channels: int = 1):
+        self.channels = channels  # 通道数
+        self.played_frames = 0  # 已送出的帧数
+        self._blocks = iter(blocks)
+        self._pending = np.empty(0, dtype=np.int16)  # 当前块中尚未送出的样本
+        self._buffer = np.empty(0, dtype=np.int16)  # 回调输出缓冲区，按需扩大
+        self._paused = threading.Event()
+        self._stopped = threading.Event()
+        self._done = threading.Event()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PyAudio 输出回调"""
+        n = frame_count * self.channels
+        if self._buffer.size < n:
+            self._buffer = np.empty(n, dtype=np.int16)
+        out = self._buffer[:n]
+        if self._stopped.is_set():
+            self._done.set()
+            return out[:0].tobytes(), _PA_ABORT
+        if self._paused.is_set():  # 暂停时输出静音，流保持运行
+            out[:] = 0
+            return out.tobytes(), _PA_CONTINUE
+
+        filled = 0
+        while filled < n:
+            if self._pending.size == 0:
+                block = next(self._blocks, None)
+                if block is None:
+                    break
+                self._pending = np.asarray(block, dtype=np.int16).ravel()
+                continue
+            k = min(n - filled, self._pending.size)
+            out[filled : filled + k] = self._pending[:k]
+            self._pending = self._pending[k:]
+            filled += k
+        self.played_frames += filled // self.channels
+        if filled < n:  # 数据取完，补零后结束
+            out[filled:] = 0
+            self._done.set()
+            return out.tobytes(), _PA_COMPLETE
+        return out.tobytes(), _PA_CONTINUE
+
+    def pause(self):
+        """暂停播放"""
+        self._paused.set()
+
+    def resume(self):
+        """继续播放"""
+        self._paused.clear()
+
+    def stop(self):
+        """停止播放，之后的回调不再取数"""
+        self._stopped.set()
+        self._done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待播放结束
+
+        :param float timeout: 超时时间 (单位: s)，为 None 时一直等待, defaults to None
+        :return bool: 是否已结束
+        """
+        return self._done.wait(timeout)
+
+    @property
+    def paused(self) -> bool:
+        """是否处于暂停状态"""
+        return self._paused.is_set()
+
+    @property
+    def done(self) -> bool:
+        """是否已播放完或已停止"""
+        return self._done.is_set()
+
+
+class RingBuffer:
+    """固定容量的环形缓冲区，保留最近写入的若干帧
+
+    :param int frames: 容量 (帧数)
+    :param int channels: 通道数, defaults to 1
+    :param dtype: 数据类型, defaults to np.int16
+
+    >>> rb = RingBuffer(4)
+    >>> rb.write(np.arange(3))
+    >>> rb.write(np.arange(3, 6))
+    >>> rb.get().ravel()
+    array([2, 3, 4, 5], dtype=int16)
+    """
+
+    def __init__(self, frames: int, channels: int = 1, dtype=np.int16):
+        self._data = np.zeros((frames, channels), dtype=dtype)
+        self._pos = 0  # 下一帧写入的位置
+        self._count = 0  # 已保存的帧数
+        self._lock = threading.Lock()
+
+    def write(self, block: np.ndarray):
+        """写入一块数据，超出容量时覆盖最旧的帧
+
+        :param np.ndarray block: 音频块 (帧数,) 或 (帧数 × 通道数)
+        """
+        size, channels = self._data.shape
+        if size == 0:
+            return
+        block = np.asarray(block).reshape(-1, channels)[-size:]
+        n = len(block)
+        with self._lock:
+            k = min(n, size - self._pos)
+            self._data[self._pos : self._pos + k] = block[:k]
+            self._data[: n - k] = block[k:]
+            self._pos = (self._pos + n) % size
+            self._count = min(self._count + n, size)
+
+    def get(self) -> np.ndarray:
+        """按时间顺序返回已保存的帧的副本
+
+        :return np.ndarray: 音频数据 (帧数 × 通道数)
+        """
+        with self._lock:
+            if self._count < len(self._data):
+                return self._data[: self._count].copy()
+            return np.concatenate((self._data[self._pos :], self._data[: self._pos]))
+
+
+class Recorder:
+    """录音句柄，由 Sound.record 创建
+
+    数据逐块写入 WavWriter，内存占用只与块大小和环形缓冲区容量有关。
+    回调模式下音频线程只把数据放入队列，由后台线程写盘，避免输入溢出
+
+    :param WavWriter writer: 输出文件
+    :param int n_frames: 录制的帧数，为 None 时录到 stop 为止
+    :param int ring_frames: 环形缓冲区容量 (帧数)，0 为不保留, defaults to 0
+    """
+
+    def __init__(self, writer: WavWriter, n_frames: int = None, ring_frames: int = 0):
+        self.writer = writer  # 输出文件
+        self.n_frames = n_frames  # 录制的帧数
+        self.stream = None  # 输入流，结束时关闭
+        format_tag, bits, _ = _SAMPLE_FORMATS[writer.sample_format]
+        self._info = _WavInfo(
+            format_tag, writer.channels, writer.rate, bits, writer._block_align, 0, 0
+        )
+        self.ring = None  # 最近若干帧的环形缓冲区
+        if ring_frames:
+            dtype = np.int32 if bits == 24 else _wav_dtype(self._info)
+            self.ring = RingBuffer(ring_frames, writer.channels, dtype)
+        self._queue = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def recorded_frames(self) -> int:
+        """已写入的帧数"""
+        return self.writer.n_frames
+
+    def _remaining(self) -> int:
+        """还需录制的帧数"""
+        if self.n_frames is None:
+            return -1
+        return self.n_frames - self.writer.n_frames
+
+    def _feed(self, data: bytes):
+        """写入一块原始帧字节，超出 n_frames 的部分丢弃"""
+        remaining = self._remaining()
+        if remaining >= 0:
+            data = data[: remaining * self.writer._block_align]
+        self.writer.write_frames(data)
+        if self.ring is not None and data:
+            frames = len(data) // self.writer._block_align
+            buf = np.frombuffer(data + b"\0", dtype=np.uint8)  # 24 位解码需多 1 字节
+            self.ring.write(_decode_frames(buf, frames, self._info))
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PyAudio 输入回调，只入队不写盘"""
+        if self._stopped.is_set():
+            return None, _PA_COMPLETE
+        self._queue.put(in_data)
+        if 0 <= self._remaining() <= frame_count:  # 粗略判断，精确截断在写盘线程
+            self.stop()
+            return None, _PA_COMPLETE
+        return None, _PA_CONTINUE
+
+    def _drain(self):
+        """写盘线程: 取出队列中的数据写入文件，直到收到结束标记"""
+        try:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    break
+                self._feed(data)
+        finally:
+            self._finish()
+
+    def _start(self):
+        """启动写盘线程 (回调模式)"""
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _finish(self):
+        """关闭输入流和文件"""
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        self.writer.close()
+        self._done.set()
+
+    def stop(self):
+        """停止录音，已入队的数据仍会写入文件"""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._queue.put(None)
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待录音结束且文件已关闭
+
+        :param float timeout: 超时时间 (单位: s)，为 None 时一直等待, defaults to None
+        :return bool: 是否已结束
+        """
+        return self._done.wait(timeout)
+
+    def last(self) -> np.ndarray:
+        """返回环形缓冲区中最近的若干帧
+
+        :return np.ndarray: 音频数据 (帧数 × 通道数)，未启用环形缓冲区时为 None
+        """
+        return None if self.ring is None else self.ring.get()
+
+    @property
+    def done(self) -> bool:
+        """是否已结束"""
+        return self._done.is_set()
 
 
 class Sound:
@@ -10,22 +717,43 @@ class Sound:
 
     :param int rate: PyAudio 实例, defaults to 44100
     :param int chunk: 块大小, defaults to 1024
-    :param _type_ format_: 音频格式, defaults to pyaudio.paInt16
+    :param _type_ format_: 音频格式, defaults to paInt16
     :param int channal: 声道数, defaults to 1
+    :param pa: PyAudio 实例，为 None 时在首次使用音频设备时获取进程内共享的实例,
+        defaults to None
     """
 
     def __init__(
         self,
         rate: int = 44100,
         chunk: int = 1024,
-        format_=pyaudio.paInt16,
+        format_=paInt16,
         channal: int = 1,
+        pa=None,
     ):
-        self.p = pyaudio.PyAudio()  # 实例化PyAudio类
+        self._p = pa  # PyAudio 实例，延迟获取
+        self._release = None  # 共享实例的释放函数
         self.rate = rate  # 采样速率
         self.chunk = chunk  # 块大小
         self.format = format_  # 格式
         self.channal = channal  # 声道数
+        self.playback = None  # 当前的非阻塞播放句柄
+        self._play_stream = None  # 回调播放流，多次播放间保持打开
+        self._play_key = None  # 回调播放流的 (采样率, 通道数)
+
+    @property
+    def p(self):
+        """PyAudio 实例，首次访问时获取共享实例"""
+        if self._p is None:
+            self._p = _acquire_pyaudio()
+            self._release = weakref.finalize(self, _release_pyaudio)
+        return self._p
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @staticmethod
     def to_wav_from_ndarray(
@@ -33,75 +761,139 @@ class Sound:
         filename: str,
         level: float = 5.0,
         rate: int = 44100,
-        format_=pyaudio.paInt16,
+        format_=paInt16,
         channal: int = 1,
+        mode: str = "peak",
     ):
         """将一个 np.ndarray 保存为 wav 音频文件
 
         :param np.ndarray array: 转换的 np.ndarray
         :param str filename: 目标文件名称
-        :param float level: 声音等级(0-30), 0 为不做变化, defaults to 5.0
+        :param float level: 声音等级(0-30)，峰值归一化为 level * 1e3 (int16 单位)，
+            0 为不做变化 (数值按目标格式的单位写入), defaults to 5.0
         :param int rate: 采样率, defaults to 44100
-        :param _type_ format_: 数据格式, defaults to pyaudio.paInt16
+        :param _type_ format_: 数据格式, defaults to paInt16
         :param int channal: 通道数, defaults to 1
+        :param str mode: 归一化模式 ("peak"、"rms" 或 "gain")，
+            "gain" 时 level * 1e3 即增益, defaults to "peak"
+        :raises ValueError: 数据格式不支持或单遍迭代器需要两遍归一化
+
+        >>> import os, tempfile
+        >>> filename = os.path.join(tempfile.mkdtemp(), "a.wav")
+        >>> x = np.array([7549747, -4194304, 83])
+        >>> Sound.to_wav_from_ndarray(x, filename, level=0, format_=paInt24)
+        >>> Sound.load_wav(filename)[0]
+        array([ 7549747, -4194304,       83], dtype=int32)
         """
-        assert level >= 0 and level <= 30, "声音等级必须在 0-30 之间"
-        if level > 0:
-            # 归一化
-            array = array / np.max(array)
-            array = array * 1e3 * level
+        target, mode = _level_target(level, mode)
         if filename.split(".")[-1] != "wav":
             filename += ".wav"
-        array_bytes = array.astype(np.int16).tobytes()
-
-        wf = wave.open(filename, "wb")
-        wf.setnchannels(channal)
-        # wf.setsampwidth(self.p.get_sample_size(self.format))
-        wf.setsampwidth(pyaudio.PyAudio().get_sample_size(format_))
-        wf.setframerate(rate)
-        wf.writeframes(array_bytes)
-        wf.close()
+        if format_ not in _PA_SAMPLE_FORMATS:
+            raise ValueError(f"不支持的数据格式: {format_}")
+        sample_format = _PA_SAMPLE_FORMATS[format_]
+        _check_two_pass(array, mode)
+        gain = normalize_gain(array, target, mode)
+        # 以 float64 满量程 [-1, 1] 交给 WavWriter 转换，保留目标格式的精度:
+        # 声音等级以 int16 为单位；等级 0 时数值按目标格式原样写入
+        full_scale = _SAMPLE_FORMATS[sample_format][2] if level == 0 else 1 << 15
+        with WavWriter(filename, rate, channal, sample_format) as wf:
+            for block in _iter_blocks(array):
+                wf.write(np.multiply(block, gain / full_scale, dtype=np.float64))
 
     @staticmethod
-    def load_wav(filename: str) -> tuple:
+    def load_wav(filename: str, mmap: bool = False, normalize: bool = False) -> tuple:
         """加载 wav 文件，返回 np.ndarray 数据和采样率
 
+        支持 8/16/24/32 位整数 PCM 和 32/64 位浮点 (含 WAVE_FORMAT_EXTENSIBLE)，
+        单声道返回一维数组，多声道返回 (帧数 × 通道数) 数组
+
         :param str filename: 文件名
-        :raises ValueError: _description_
+        :param bool mmap: 返回 data 块的只读 np.memmap 视图 (帧数 × 通道数)，
+            不把文件读入内存, defaults to False
+        :param bool normalize: 归一化为 [-1, 1) 的 float32, defaults to False
+        :raises ValueError: 不支持的格式
         :return tuple: (音频数据, 采样率)
         """
-        # 打开WAV文件
-        with wave.open(filename, "rb") as wav_file:
-            # 获取音频文件参数
-            # n_channels: 音频文件的通道数，比如单声道（1）或立体声（2）。
-            # sample_width: 每个样本的字节宽度。例如，8位音频是1字节，16位音频是2字节。
-            # frame_rate: 帧率，即每秒的帧数（帧/秒），等同于采样率。
-            # n_frames: 音频文件中的总帧数。
-            # comptype: 压缩类型，对于未压缩的WAV文件通常是'NONE'。
-            # compname: 压缩名称，对于未压缩的WAV文件通常是'not compressed'。
-            n_channels, sample_width, frame_rate, n_frames, comptype, compname = (
-                wav_file.getparams()
+        with open(filename, "rb") as f:
+            info = _read_wav_header(f)
+            if not mmap:
+                # 24 位 PCM 解码时需要多留 1 个字节
+                buf = np.zeros(info.n_frames * info.block_align + 1, dtype=np.uint8)
+                f.readinto(buf[:-1])
+        if mmap:
+            dtype = _wav_dtype(info)
+            if dtype is None or normalize:
+                raise ValueError("mmap 模式不支持 24 位 PCM 和归一化，请使用 iter_wav")
+            audio_data = np.memmap(
+                filename,
+                dtype=dtype,
+                mode="r",
+                offset=info.offset,
+                shape=(info.n_frames, info.channels),
             )
+            return audio_data, info.rate
 
-            # 读取音频文件的帧数据
-            frames = wav_file.readframes(n_frames)
+        audio_data = _decode_frames(buf, info.n_frames, info, normalize)
+        if info.channels == 1:
+            audio_data = audio_data.reshape(-1)
+        return audio_data, info.rate
 
-            # 将帧数据转换为numpy数组
-            # dtype根据sample_width选择，这里假设是16位PCM数据
-            if sample_width == 2:
-                dtype = np.int16
-            elif sample_width == 4:
-                dtype = np.int32
-            else:
-                raise ValueError("Unsupported sample width")
-
-            audio_data = np.frombuffer(frames, dtype=dtype)
+    @staticmethod
+    def iter_wav(
+        filename: str,
+        block_frames: int = 4096,
+        overlap: int = 0,
+        start: int = 0,
+        stop: int = None,
+        start_time: float = None,
+        stop_time: float = None,
+        reuse_buffer: bool = False,
+        normalize: bool = False,
+    ):
+        """按块读取 wav 文件，内存占用只与块大小有关
 
-            # 如果是立体声，需要将数据reshape成2D数组
-            if n_channels == 2:
-                audio_data = audio_data.reshape(-1, 2)
+        :param str filename: 文件名
+        :param int block_frames: 每块帧数, defaults to 4096
+        :param int overlap: 相邻块重叠的帧数, defaults to 0
+        :param int start: 起始帧, defaults to 0
+        :param int stop: 结束帧 (不含), defaults to None
+        :param float start_time: 起始时间 (单位: s)，给定时代替 start, defaults to None
+        :param float stop_time: 结束时间 (单位: s)，给定时代替 stop, defaults to None
+        :param bool reuse_buffer: 每块复用同一个缓冲区 (下一块读入前需用完), defaults to False
+        :param bool normalize: 归一化为 [-1, 1) 的 float32, defaults to False
+        :raises ValueError: overlap 不在 [0, block_frames) 内
+        :yield np.ndarray: 音频块 (帧数 × 通道数)
+        """
+        if not 0 <= overlap < block_frames:
+            raise ValueError("overlap 必须在 0 到 block_frames 之间")
+        with open(filename, "rb") as f:
+            info = _read_wav_header(f)
+            if start_time is not None:
+                start = round(start_time * info.rate)
+            if stop_time is not None:
+                stop = round(stop_time * info.rate)
+            start, stop, _ = slice(start, stop).indices(info.n_frames)
+            f.seek(info.offset + start * info.block_align)
 
-            return audio_data, frame_rate
+            # 原始字节缓冲区，末尾多留 1 个字节供 24 位 PCM 解码
+            ba = info.block_align
+            buf = np.empty(block_frames * ba + 1, dtype=np.uint8)
+            filled = 0  # 缓冲区中已有的帧数
+            pos = start
+            while pos < stop:
+                n = min(block_frames - filled, stop - pos)
+                got = f.readinto(buf[filled * ba : (filled + n) * ba]) // ba
+                if got == 0:
+                    break
+                pos += got
+                filled += got
+                block = _decode_frames(buf, filled, info, normalize)
+                if not reuse_buffer and block.base is buf:
+                    block = block.copy()
+                yield block
+                if pos < stop and overlap:  # 保留末尾的重叠部分
+                    buf[: overlap * ba] = buf[(filled - overlap) * ba : filled * ba]
+                filled = overlap
 
     def open_stream(self, write=False):
         """打开流
@@ -121,48 +913,205 @@ class Sound:
         self.stream.stop_stream()
         self.stream.close()
 
-    def play_ndarray(self, array: np.ndarray, rate: int = 44100, level: float = 1.0):
-        """播放 np.ndarray 形式的音频,目前是整体处理，文件肯定不能特别大
+    def play_ndarray(
+        self,
+        array: np.ndarray,
+        rate: int = 44100,
+        level: float = 1.0,
+        mode: str = "peak",
+    ):
+        """播放 np.ndarray 形式的音频，按块归一化并写入音频流
 
-        :param np.ndarray array: np.ndarray 序列
+        :param np.ndarray array: np.ndarray 序列 (可为 memmap)
         :param int rate: 采样速率, defaults to 44100
         :param float level: 声音等级(0-30), 0 为不做变化, defaults to 1.0
+        :param str mode: 归一化模式 ("peak"、"rms" 或 "gain")，
+            "gain" 时 level * 1e3 即增益, defaults to "peak"
         """
-        assert level >= 0 and level <= 30, "声音等级必须在 0-30 之间"
-        if level > 0:
-            # 归一化
-            array = array / np.max(array)
-            array = array * 1e3 * level
+        target, mode = _level_target(level, mode)
         self.rate = rate
-        array_bytes = array.astype(np.int16).tobytes()
         self.open_stream()
-        self.stream.write(array_bytes)
+        for block in iter_normalized(array, target, mode):
+            self.stream.write(block.tobytes())
         self.close_stream()
         # self.p.terminate()
 
-    def record(self, filename: str, record_seconds: int):
-        """记录声音
+    def play(
+        self,
+        source,
+        rate: int = None,
+        level: float = 1.0,
+        mode: str = "peak",
+    ) -> Playback:
+        """非阻塞播放，通过回调按 self.chunk 帧逐块送出数据，立即返回控制句柄
+
+        开始新的播放会停止上一次播放，播放流在多次播放间保持打开，由 close 关闭
+
+        :param source: np.ndarray (可为 memmap)、返回块迭代器的无参函数或块迭代器；
+            块迭代器只能读一遍，此时须 level=0 或 mode="gain"
+        :param int rate: 采样速率，为 None 时使用 self.rate, defaults to None
+        :param float level: 声音等级(0-30), 0 为不做变化, defaults to 1.0
+        :param str mode: 归一化模式 ("peak"、"rms" 或 "gain"), defaults to "peak"
+        :raises ValueError: 单遍迭代器需要两遍归一化
+        :return Playback: 播放句柄，支持 pause、resume、stop、wait
+
+        >>> class FakeStream:
+        ...     def __init__(self, stream_callback, frames_per_buffer, **kwargs):
+        ...         self.callback, self.n, self.data = stream_callback, frames_per_buffer, []
+        ...     def start_stream(self):  # 同步地驱动回调直到结束
+        ...         flag = _PA_CONTINUE
+        ...         while flag == _PA_CONTINUE:
+        ...             data, flag = self.callback(None, self.n, None, 0)
+        ...             self.data.append(data)
+        ...     def stop_stream(self):
+        ...         pass
+        ...     def close(self):
+        ...         pass
+        >>> class FakePyAudio:
+        ...     def open(self, **kwargs):
+        ...         self.stream = FakeStream(**kwargs)
+        ...         return self.stream
+        >>> s = Sound(chunk=4, pa=FakePyAudio())
+        >>> s.play(np.arange(6, dtype=np.int16), level=0).wait(1)
+        True
+        >>> np.frombuffer(b"".join(s.p.stream.data), dtype=np.int16)
+        array([0, 1, 2, 3, 4, 5, 0, 0], dtype=int16)
+        """
+        target, mode = _level_target(level, mode)
+        _check_two_pass(source, mode)
+        # 第一遍 (计算电平) 在调用线程完成，音频回调中只做第二遍的逐块缩放
+        block_frames = self.chunk * 64
+        gain = normalize_gain(source, target, mode, block_frames)
+        blocks = (
+            apply_gain(block, gain) for block in _iter_blocks(source, block_frames)
+        )
+
+        if rate is not None:
+            self.rate = rate
+        if self.playback is not None:
+            self.playback.stop()
+        if self._play_key != (self.rate, self.channal):
+            self._close_play_stream()
+            self._play_stream = self.p.open(
+                format=paInt16,
+                channels=self.channal,
+                rate=self.rate,
+                output=True,
+                frames_per_buffer=self.chunk,
+                stream_callback=self._on_output,
+                start=False,
+            )
+            self._play_key = (self.rate, self.channal)
+        else:
+            self._play_stream.stop_stream()  # 回调结束后需先停止才能再次启动
+        self.playback = Playback(blocks, self.channal)
+        self._play_stream.start_stream()
+        return self.playback
+
+    def _on_output(self, in_data, frame_count, time_info, status):
+        """回调播放流的回调，转发给当前播放句柄"""
+        if self.playback is None:
+            return b"", _PA_COMPLETE
+        return self.playback._callback(in_data, frame_count, time_info, status)
+
+    def close(self):
+        """停止非阻塞播放，关闭回调播放流并释放共享的 PyAudio 实例"""
+        self._close_play_stream()
+        if self._release is not None:
+            self._release()
+            self._release = None
+            self._p = None
+
+    def _close_play_stream(self):
+        """停止非阻塞播放并关闭回调播放流"""
+        if self.playback is not None:
+            self.playback.stop()
+        if self._play_stream is not None:
+            self._play_stream.stop_stream()
+            self._play_stream.close()
+        self._play_stream = None
+        self._play_key = None
+
+    def record(
+        self,
+        filename: str,
+        record_seconds: float = None,
+        ring_seconds: float = 0,
+        callback: bool = False,
+    ) -> Recorder:
+        """录音，逐块写入 wav 文件，内存占用与录音时长无关
 
         :param str filename: 保存的文件名
-        :param int record_seconds: 录音时间
+        :param float record_seconds: 录音时间，回调模式下为 None 时录到 stop 为止,
+            defaults to None
+        :param float ring_seconds: 在内存中保留最近的秒数 (Recorder.last 读取), defaults to 0
+        :param bool callback: 使用回调模式，立即返回录音句柄, defaults to False
+        :raises ValueError: 阻塞模式未给出录音时间或格式不支持
+        :return Recorder: 录音句柄
+
+        >>> import os, tempfile
+        >>> class FakeStream:
+        ...     def __init__(self):
+        ...         self.t = 0
+        ...     def read(self, n, exception_on_overflow=True):
+        ...         self.t += n
+        ...         return np.arange(self.t - n, self.t, dtype=np.int16).tobytes()
+        ...     def stop_stream(self):
+        ...         pass
+        ...     def close(self):
+        ...         pass
+        >>> class FakePyAudio:
+        ...     def open(self, **kwargs):
+        ...         return FakeStream()
+        >>> s = Sound(rate=10, chunk=4, pa=FakePyAudio())
+        >>> filename = os.path.join(tempfile.mkdtemp(), "a.wav")
+        >>> s.record(filename, 1, ring_seconds=0.3).last().ravel()
+        Record start ...
+        Record end.
+        array([7, 8, 9], dtype=int16)
+        >>> Sound.load_wav(filename)
+        (array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], dtype=int16), 10)
         """
-        frames = []
-        self.open_stream(input_=True)
-
-        print("Record start ...")
-        for i in range(0, int(self.rate / self.chunk * record_seconds)):
-            data = self.stream.read(self.chunk)
-            frames.append(data)
-        print("Record end.")
-        self.close_stream()
-        self.p.terminate()
-
-        wf = wave.open(filename, "wb")
-        wf.setnchannels(self.channal)
-        wf.setsampwidth(self.p.get_sample_size(self.format))
-        wf.setframerate(self.rate)
-        wf.writeframes(b"".join(frames))
-        wf.close()
+        if self.format not in _PA_SAMPLE_FORMATS:
+            raise ValueError(f"不支持的数据格式: {self.format}")
+        if record_seconds is None and not callback:
+            raise ValueError("阻塞模式需要给出录音时间")
+        n_frames = None if record_seconds is None else int(self.rate * record_seconds)
+        writer = WavWriter(
+            filename, self.rate, self.channal, _PA_SAMPLE_FORMATS[self.format]
+        )
+        recorder = Recorder(writer, n_frames, int(self.rate * ring_seconds))
+        kwargs = dict(
+            format=self.format,
+            channels=self.channal,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk,
+        )
+        if callback:
+            kwargs.update(stream_callback=recorder._callback, start=False)
+        try:
+            recorder.stream = self.p.open(**kwargs)
+        except BaseException:  # 打开失败时关闭已创建的文件
+            recorder.stop()
+            recorder._finish()
+            raise
+        if callback:
+            # 先保存输入流再启动写盘线程和输入流，结束时才能关闭它
+            recorder._start()
+            recorder.stream.start_stream()
+            return recorder
+
+        try:
+            print("Record start ...")
+            while recorder._remaining() > 0:
+                recorder._feed(
+                    recorder.stream.read(self.chunk, exception_on_overflow=False)
+                )
+            print("Record end.")
+        finally:
+            recorder._finish()
+        return recorder
 
 
 if __name__ == "__main__":